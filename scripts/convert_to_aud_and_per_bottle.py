@@ -34,11 +34,19 @@ The script uses the following conversion rates to AUD:
 - Euro (€): 1.81 AUD
 - British Pound (£): 2.13 AUD
 
+Prices already in the AUD output format (e.g. "$12.34") are left unchanged, so the
+script can safely be re-run on a processed sheet. Prices suffixed with "AUD" are
+not converted.
+
 To update these rates, modify the CURRENCY_RATES dictionary below.
 """
 
 import os
 import re
+import sys
+import string
+import functools
+import itertools
 import argparse
 import urllib.parse
 from google.oauth2 import service_account
@@ -58,20 +66,49 @@ CURRENCY_RATES = {
     '£': 2.13,   # GBP to AUD
 }
 
+# Currency codes accepted at the end of a price, mapped to their CURRENCY_RATES symbol
+CURRENCY_CODES = {
+    "USD": "$", "EUR": "€", "GBP": "£", "ZAR": "R",
+    "AUD": "AUD",  # Already AUD: no rate, so the amount is not converted
+}
+
+# Spreadsheet column letters by 0-based index: A..Z, AA..ZZ, AAA..ZZZ
+_COL_LETTERS = [''.join(letters) for length in range(1, 4)
+                for letters in itertools.product(string.ascii_uppercase, repeat=length)]
+
+# Precompiled patterns used on every processed cell / URL
+_SPREADSHEET_ID_RE = re.compile(r'/spreadsheets/d/([a-zA-Z0-9-_]+)')
+_GID_RE = re.compile(r'[?&#]gid=(\d+)')
+_CASE_RE = re.compile(r'for\s+(\d+)x')
+_CASE_STRIP_RE = re.compile(r'for\s+\d+x\s+\d+ml')
+_AUD_PRICE_RE = re.compile(r'\$\d+\.\d{2}')  # The output format of convert_currency_to_aud
+
+# Deletes every ASCII character except digits and the decimal point
+_NON_NUMERIC_TABLE = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128)) if not (c.isdigit() or c == '.')))
+
+# Single-pass parse of the common price formats, e.g. "R1,620.00", "R1 350,00 / Case",
+# "R1050,00 for 6x 750ml" or "12,50 EUR". Anything else is parsed step by step.
+_PRICE_RE = re.compile(
+    r'(?:(?P<symbol>[R$€£])\s*(?P<amount>[\d.,\s]*\d[\d.,]*)'
+    r'|(?P<suffix_amount>[\d.,\s]*\d[\d.,]*)\s*(?P<suffix>USD|EUR|GBP|ZAR|AUD|[R$€£]))'
+    r'(?:(?P<case> / Case| per case)|\s+for\s+(?P<bottles>\d+)x\s+\d+ml)?'
+)
+
 def extract_spreadsheet_info(url):
     """Extract spreadsheet ID and sheet GID from a Google Sheets URL."""
     if not url:
         return None, None
     
     # Extract spreadsheet ID
-    spreadsheet_id_match = re.search(r'/spreadsheets/d/([a-zA-Z0-9-_]+)', url)
+    spreadsheet_id_match = _SPREADSHEET_ID_RE.search(url)
     if not spreadsheet_id_match:
         return None, None
     
     spreadsheet_id = spreadsheet_id_match.group(1)
     
     # Extract sheet GID
-    gid_match = re.search(r'[?&#]gid=(\d+)', url)
+    gid_match = _GID_RE.search(url)
     sheet_gid = gid_match.group(1) if gid_match else None
     
     return spreadsheet_id, sheet_gid
@@ -80,12 +117,17 @@ def authenticate_google_sheets():
     """Authenticate with Google Sheets API using service account."""
     creds = service_account.Credentials.from_service_account_file(
         SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    service = build('sheets', 'v4', credentials=creds)
+    # Use the discovery document bundled with the client library; there is no
+    # discovery cache to look up (or warn about) when it isn't fetched over HTTP
+    service = build('sheets', 'v4', credentials=creds, static_discovery=True, cache_discovery=False)
     return service.spreadsheets()
 
 def get_sheet_names_and_gids(sheets, spreadsheet_id):
     """Get all sheet names and their GIDs from the spreadsheet."""
-    sheet_metadata = sheets.get(spreadsheetId=spreadsheet_id).execute()
+    sheet_metadata = sheets.get(
+        spreadsheetId=spreadsheet_id,
+        fields='sheets.properties(sheetId,title)'  # Skip the rest of the spreadsheet metadata
+    ).execute()
     sheets_data = sheet_metadata.get('sheets', [])
     
     sheets_info = []
@@ -111,46 +153,77 @@ def convert_currency_to_aud(price_str, wine_name=None):
     if not price_str or price_str == "N/A" or price_str == "Not available" or price_str == "Not specified":
         return price_str
     
-    # Convert to string if necessary
-    price_str = str(price_str).strip()
+    # Already converted, e.g. "$12.34" or " $12.34 " - "$" here is AUD rather than USD
+    stripped_price = str(price_str).strip()
+    if _AUD_PRICE_RE.fullmatch(stripped_price):
+        return price_str
+    
+    # The wine name only matters for promo detection, so conversions are cached
+    # per (price, is promo) - sheets repeat the same few prices on many rows
+    is_promo = bool(wine_name) and 'promo' in wine_name.lower()
+    return convert_price(stripped_price, is_promo)
+
+@functools.lru_cache(maxsize=None)
+def convert_price(price_str, is_promo):
+    """Convert a non-empty price string to AUD, see convert_currency_to_aud."""
+    # Convert to string if necessary, and collapse runs of whitespace so that both parsing
+    # paths below see e.g. "R 1050,00  / Case" as "R 1050,00 / Case"
+    price_str = ' '.join(str(price_str).split())
     
     # Check for case pricing and bottles per case
     case_price = False
     bottles_per_case = 12  # Default bottles per case
     
-    if " / Case" in price_str or " per case" in price_str:
-        case_price = True
-        price_str = price_str.replace(" / Case", "").replace(" per case", "")
-    
-    # Check for formats like "R1,620,00 for 6x 750ml"
-    case_match = re.search(r'for\s+(\d+)x', price_str)
-    if case_match:
-        case_price = True
-        bottles_per_case = int(case_match.group(1))
-        price_str = re.sub(r'for\s+\d+x\s+\d+ml', '', price_str)
-    
-    # First, extract any currency symbol or code
-    currency_symbol = None
-    # Look for common currency symbols at the start
-    if price_str.startswith(('R', '$', '€', '£')):
-        currency_symbol = price_str[0]
-        price_str = price_str[1:]
-    # Look for currency code at the end
-    elif price_str.endswith(('USD', 'EUR', 'GBP', 'ZAR', 'AUD')):
-        currency_code = price_str[-3:]
-        currency_mapping = {
-            "USD": "$", "EUR": "€", "GBP": "£", "ZAR": "R", "AUD": "$"
-        }
-        currency_symbol = currency_mapping.get(currency_code, "$")
-        price_str = price_str[:-3]
-    # Look for currency symbols at the end
-    elif price_str.endswith(('R', '$', '€', '£')):
-        currency_symbol = price_str[-1]
-        price_str = price_str[:-1]
-    
-    # Skip conversion if no currency symbol was found
-    if not currency_symbol:
-        return price_str
+    price_match = _PRICE_RE.fullmatch(price_str)
+    if price_match:
+        # Common formats are parsed in a single pass
+        if price_match.group('symbol'):
+            currency_symbol = price_match.group('symbol')
+            price_str = price_match.group('amount')
+        else:
+            suffix = price_match.group('suffix')
+            currency_symbol = CURRENCY_CODES.get(suffix, suffix)
+            price_str = price_match.group('suffix_amount')
+        if price_match.group('case'):
+            case_price = True
+        elif price_match.group('bottles'):
+            case_price = True
+            bottles_per_case = int(price_match.group('bottles'))
+    else:
+        if " / Case" in price_str or " per case" in price_str:
+            case_price = True
+            price_str = price_str.replace(" / Case", "").replace(" per case", "")
+        
+        # Check for formats like "R1,620,00 for 6x 750ml"
+        case_match = _CASE_RE.search(price_str)
+        if case_match:
+            case_price = True
+            bottles_per_case = int(case_match.group(1))
+            price_str = _CASE_STRIP_RE.sub('', price_str)
+        
+        # Drop the space left in front of a removed case marker, which would otherwise
+        # break the decimal comma check below
+        price_str = price_str.strip()
+        
+        # First, extract any currency symbol or code
+        currency_symbol = None
+        # Look for common currency symbols at the start
+        if price_str[:1] in CURRENCY_RATES:
+            currency_symbol = price_str[0]
+            price_str = price_str[1:]
+        # Look for currency code at the end
+        elif price_str[-3:] in CURRENCY_CODES:
+            currency_symbol = CURRENCY_CODES[price_str[-3:]]
+            price_str = price_str[:-3]
+        # Look for currency symbols at the end
+        elif price_str[-1:] in CURRENCY_RATES:
+            currency_symbol = price_str[-1]
+            price_str = price_str[:-1]
+        price_str = price_str.strip()
+        
+        # Skip conversion if no currency symbol was found
+        if not currency_symbol:
+            return price_str
     
     # Clean the price string - remove any non-numeric characters except decimal point
     # First replace comma with dot if it's in decimal position (e.g., R100,50)
@@ -167,18 +240,21 @@ def convert_currency_to_aud(price_str, wine_name=None):
         price_str = price_str.replace(',', '')
     
     # Remove any remaining non-numeric characters except the decimal point
-    price_str = ''.join(c for c in price_str if c.isdigit() or c == '.')
+    if price_str.isascii():
+        price_str = price_str.translate(_NON_NUMERIC_TABLE)
+    else:
+        price_str = ''.join(c for c in price_str if c.isdigit() or c == '.')
     
     try:
         # Convert to float
         amount = float(price_str)
         
         # Check if this is a promo item (based on wine name) and price is above 90
-        if wine_name and 'promo' in wine_name.lower() and amount > 90:
+        if is_promo and amount > 90:
             case_price = True
         
         # Convert to AUD if not already AUD
-        if currency_symbol in CURRENCY_RATES and currency_symbol != '$AUD':
+        if currency_symbol in CURRENCY_RATES:
             amount = amount * CURRENCY_RATES[currency_symbol]
         
         # For case prices, divide by appropriate factor
@@ -202,11 +278,21 @@ def update_sheet_data(sheets, updates, spreadsheet_id, sheet_name):
         'data': []
     }
     
-    for row_idx, col_idx, new_value in updates:
-        cell_range = f"{sheet_name}!{chr(65 + col_idx)}{row_idx+1}"
+    # Merge updates to consecutive rows of the same column into a single range
+    runs = []  # [col_idx, first_row_idx, last_row_idx, values]
+    for row_idx, col_idx, new_value in sorted(updates, key=lambda update: (update[1], update[0])):
+        if runs and runs[-1][0] == col_idx and runs[-1][2] == row_idx - 1:
+            runs[-1][2] = row_idx
+            runs[-1][3].append([new_value])
+        else:
+            runs.append([col_idx, row_idx, row_idx, [[new_value]]])
+    
+    for col_idx, first_row_idx, last_row_idx, values in runs:
+        col = _COL_LETTERS[col_idx]
+        cell_range = f"{sheet_name}!{col}{first_row_idx+1}:{col}{last_row_idx+1}"
         batch_update_body['data'].append({
             'range': cell_range,
-            'values': [[new_value]]
+            'values': values
         })
     
     result = sheets.values().batchUpdate(
@@ -220,6 +306,7 @@ def update_sheet_data(sheets, updates, spreadsheet_id, sheet_name):
 def process_pricing_data(data):
     """Process the sheet data and return list of updates."""
     updates = []
+    log_lines = []  # Per-row change log, written out in one go at the end
     
     # Find column indices for RRP and Discount RRP
     try:
@@ -255,8 +342,8 @@ def process_pricing_data(data):
             if new_rrp != original_rrp:
                 updates.append((row_idx, rrp_col, new_rrp))
                 row_updated = True
-                print(f"Row {row_idx+1} - {product_name}")
-                print(f"  RRP: {original_rrp} → {new_rrp}")
+                log_lines.append(f"Row {row_idx+1} - {product_name}")
+                log_lines.append(f"  RRP: {original_rrp} → {new_rrp}")
         
         # Process Discount RRP column
         if discount_rrp_col < len(row) and row[discount_rrp_col]:
@@ -265,12 +352,15 @@ def process_pricing_data(data):
             if new_discount != original_discount:
                 updates.append((row_idx, discount_rrp_col, new_discount))
                 if not row_updated:
-                    print(f"Row {row_idx+1} - {product_name}")
-                print(f"  Discount RRP: {original_discount} → {new_discount}")
+                    log_lines.append(f"Row {row_idx+1} - {product_name}")
+                log_lines.append(f"  Discount RRP: {original_discount} → {new_discount}")
                 row_updated = True
         
         if row_updated:
-            print("")
+            log_lines.append("")
+    
+    if log_lines:
+        sys.stdout.write("\n".join(log_lines) + "\n")
     
     return updates
 
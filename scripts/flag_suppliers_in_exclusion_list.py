@@ -22,9 +22,12 @@ Prerequisites:
 
 import os
 import re
-from fuzzywuzzy import fuzz
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import functools
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from rapidfuzz import fuzz, process
+from sheets_client import load_credentials, build_sheets_client, call_with_own_client
 
 # Constants
 QUEUE_SPREADSHEET_ID = '1JsrKKr_jZJqLmJEKxpyPygZ4lUu19-GW2dnt7p7g-1k'  # Replace with your queue spreadsheet ID
@@ -38,7 +41,16 @@ SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 NAME_SIMILARITY_THRESHOLD = 80
 EMAIL_SIMILARITY_THRESHOLD = 90
 WEBSITE_SIMILARITY_THRESHOLD = 90
-DOMAIN_SIMILARITY_THRESHOLD = 100  # Exact match for domains
+
+# Columns used for matching, in both sheets
+MATCH_COLUMNS = ["Winery or Supplier Name", "Email", "Website"]
+
+# Positions of the MATCH_COLUMNS in a sheet's header row
+ColumnIndices = collections.namedtuple('ColumnIndices', ['name', 'email', 'website'])
+
+# Number of queue rows scored at once in find_matches. Each batch holds a few
+# (batch size x exclusion list rows) matrices in memory.
+MATCH_BATCH_SIZE = 256
 
 # Common email provider base domains
 # Instead of listing every possible country variation, we use base names
@@ -83,67 +95,118 @@ EXACT_COMMON_DOMAINS = [
     'ymail.com',  # Yahoo
 ]
 
-def authenticate_google_sheets():
-    """Authenticate with Google Sheets API using service account."""
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    service = build('sheets', 'v4', credentials=creds)
-    return service.spreadsheets()
+# Lookup forms of the lists above for is_proprietary_domain: plain bases are compared
+# against the first label of a domain, dotted bases (e.g. 'me.com') as prefixes
+_EXACT_COMMON_DOMAINS = frozenset(EXACT_COMMON_DOMAINS)
+_PROVIDER_BASES = frozenset(base for base in COMMON_EMAIL_PROVIDER_BASES if '.' not in base)
+_DOTTED_PROVIDER_PREFIXES = tuple(f"{base}." for base in COMMON_EMAIL_PROVIDER_BASES if '.' in base)
+
+# Precompiled patterns used by normalize_text / extract_domain_from_website,
+# which run on every name on both sides of the matching loop
+_SUFFIX_RE = re.compile(r'\b(pty|ltd|limited|llc|inc|incorporated|corp|corporation)\b')
+_PUNCT_RE = re.compile(r'[^\w\s]')
+_WS_RE = re.compile(r'\s+')
+_PROTOCOL_RE = re.compile(r'^https?://')
+_WWW_RE = re.compile(r'^www\.')
+
+# Lookup tables for the ASCII fast path in normalize_text: the suffix words
+# matched by _SUFFIX_RE and every ASCII character matched by _PUNCT_RE
+_SUFFIXES = frozenset({'pty', 'ltd', 'limited', 'llc', 'inc', 'incorporated', 'corp', 'corporation'})
+_PUNCT_TABLE = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128)) if not (c.isalnum() or c == '_' or c.isspace())))
+
+def print_sheet_summary(values):
+    """Print the row count and headers of fetched sheet data."""
+    print(f"Found {len(values)} rows in sheet")
+    if values:
+        # One write for the whole header listing
+        lines = ["First row (headers):"]
+        lines.extend(f"Column {i}: '{header}'" for i, header in enumerate(values[0]))
+        print("\n".join(lines))
+
+def fetch_sheet_values(sheets, spreadsheet_id, sheet_name):
+    """Retrieve all data from the specified sheet without printing anything."""
+    result = sheets.values().get(
+        spreadsheetId=spreadsheet_id,
+        range=f"{sheet_name}!A:Z",  # Get all columns
+        fields='values'
+    ).execute()
+    return result.get('values', [])
 
 def get_sheet_data(sheets, spreadsheet_id, sheet_name):
     """Retrieve all data from the specified sheet."""
     print(f"\nFetching data from sheet: {sheet_name}")
-    result = sheets.values().get(
+    values = fetch_sheet_values(sheets, spreadsheet_id, sheet_name)
+    print_sheet_summary(values)
+    return values
+
+def get_multiple_sheet_data(sheets, spreadsheet_id, sheet_names):
+    """Retrieve all data from several sheets of the same spreadsheet in a single request."""
+    result = sheets.values().batchGet(
         spreadsheetId=spreadsheet_id,
-        range=f"{sheet_name}!A:Z"  # Get all columns
+        ranges=[f"{sheet_name}!A:Z" for sheet_name in sheet_names],  # Get all columns
+        fields='valueRanges.values'
     ).execute()
-    values = result.get('values', [])
-    print(f"Found {len(values)} rows in sheet")
-    if values:
-        print("First row (headers):")
-        for i, header in enumerate(values[0]):
-            print(f"Column {i}: '{header}'")
-    return values
+    value_ranges = result.get('valueRanges', [])
+    
+    all_values = []
+    for sheet_name, value_range in zip(sheet_names, value_ranges):
+        values = value_range.get('values', [])
+        print(f"\nFetched data from sheet: {sheet_name}")
+        print_sheet_summary(values)
+        all_values.append(values)
+    return all_values
 
 def get_column_indices(headers, sheet_type):
-    """Get the indices of required columns based on sheet type."""
-    if sheet_type == 'queue':
-        try:
-            # Updated column names to match new queue sheet format
-            name_col = headers.index("Winery or Supplier Name")
-            email_col = headers.index("Email")
-            website_col = headers.index("Website")
-            return name_col, website_col, email_col
-        except ValueError as e:
-            print(f"Error: Required column not found in queue sheet - {str(e)}")
-            print("Available columns in queue sheet:")
-            for i, header in enumerate(headers):
-                print(f"{i}: '{header}'")
-            return None, None, None
-    else:  # exclusion list
-        try:
-            name_col = headers.index("Winery or Supplier Name")
-            email_col = headers.index("Email")
-            website_col = headers.index("Website")
-            return name_col, email_col, website_col
-        except ValueError as e:
-            print(f"Error: Required column not found in exclusion list - {str(e)}")
-            print("Available columns in exclusion list:")
-            for i, header in enumerate(headers):
-                print(f"{i}: '{header}'")
-            return None, None, None
+    """Get the ColumnIndices of the required columns; both sheet types use the same headers.
+    All indices are None if a column is missing."""
+    sheet_label = 'queue sheet' if sheet_type == 'queue' else 'exclusion list'
+    try:
+        return ColumnIndices(*[headers.index(name) for name in MATCH_COLUMNS])
+    except ValueError as e:
+        print(f"Error: Required column not found in {sheet_label} - {str(e)}")
+        print(f"Available columns in {sheet_label}:")
+        for i, header in enumerate(headers):
+            print(f"{i}: '{header}'")
+        return ColumnIndices(None, None, None)
+
+def get_row_values(row, name_col, email_col, website_col):
+    """Return the stripped name, email and website of a row, using "" for missing cells.
+    Callers skip rows that are too short to have a name, so name_col is always present."""
+    row_len = len(row)
+    name = row[name_col].strip()
+    email = row[email_col].strip() if email_col < row_len else ""
+    website = row[website_col].strip() if website_col < row_len else ""
+    return name, email, website
 
+@functools.lru_cache(maxsize=8192)
 def normalize_text(text):
-    """Normalize text for comparison by removing common variations."""
+    """Normalize text for comparison by removing common variations.
+    Results are cached, as the same names and domains recur across rows and sheets."""
     if not text:
         return ""
     # Convert to lowercase
     text = text.lower()
+    if text.isascii():
+        # Fast path: split on whitespace, drop suffix words and strip special
+        # characters with str.translate. Words containing special characters
+        # (e.g. "smith-pty") still go through _SUFFIX_RE to keep the same result
+        words = []
+        for word in text.split():
+            stripped = word.translate(_PUNCT_TABLE)
+            if stripped == word:
+                if word in _SUFFIXES:
+                    continue
+            else:
+                stripped = _SUFFIX_RE.sub('', word).translate(_PUNCT_TABLE)
+            if stripped:
+                words.append(stripped)
+        return ' '.join(words)
     # Remove common business suffixes
-    text = re.sub(r'\b(pty|ltd|limited|llc|inc|incorporated|corp|corporation)\b', '', text)
+    text = _SUFFIX_RE.sub('', text)
     # Remove special characters and extra spaces
-    text = re.sub(r'[^\w\s]', '', text)
-    text = re.sub(r'\s+', ' ', text)
+    text = _PUNCT_RE.sub('', text)
+    text = _WS_RE.sub(' ', text)
     return text.strip()
 
 def extract_domain_from_email(email):
@@ -161,10 +224,10 @@ def extract_domain_from_website(website):
         return ""
     
     # Remove protocol (http://, https://)
-    domain = re.sub(r'^https?://', '', website.lower())
+    domain = _PROTOCOL_RE.sub('', website.lower())
     
     # Remove www.
-    domain = re.sub(r'^www\.', '', domain)
+    domain = _WWW_RE.sub('', domain)
     
     # Remove everything after the first slash
     domain = domain.split('/')[0]
@@ -174,6 +237,7 @@ def extract_domain_from_website(website):
     
     return domain.strip()
 
+@functools.lru_cache(maxsize=4096)
 def is_proprietary_domain(domain):
     """Check if a domain is proprietary (not a common email provider).
     Uses base domain matching to catch country-specific variants."""
@@ -183,148 +247,214 @@ def is_proprietary_domain(domain):
     domain = domain.lower()
     
     # Check for exact matches first
-    if domain in EXACT_COMMON_DOMAINS:
+    if domain in _EXACT_COMMON_DOMAINS:
         return False
     
     # Check if any common provider base is in the domain
-    # We split the domain by dots and check the first part
+    # We check the first part of the domain
     # This handles yahoo.com, yahoo.co.uk, yahoo.fr, etc.
-    domain_parts = domain.split('.')
-    if domain_parts and domain_parts[0] in COMMON_EMAIL_PROVIDER_BASES:
+    if domain.partition('.')[0] in _PROVIDER_BASES:
         return False
     
-    # Check for domains that might be included as part of other TLDs
-    for base in COMMON_EMAIL_PROVIDER_BASES:
-        # Check if the base name is at the start of the domain
-        # This handles cases like gmail.com, gmailuser.com.au, etc.
-        if domain.startswith(f"{base}."):
-            return False
+    # Check for bases that include a TLD, e.g. me.com.au
+    if domain.startswith(_DOTTED_PROVIDER_PREFIXES):
+        return False
     
     # If we get here, it's a proprietary domain
     return True
 
-def is_similar(text1, text2, threshold):
-    """Check if two texts are similar using fuzzy matching."""
-    if not text1 or not text2:
-        return False
-    
-    # Normalize both texts
-    norm1 = normalize_text(text1)
-    norm2 = normalize_text(text2)
-    
-    # Calculate similarity score
-    similarity = fuzz.ratio(norm1, norm2)
-    return similarity >= threshold
+def unique_texts(texts, indices):
+    """Deduplicate texts[i] for i in indices, keeping first-seen order.
+    Returns the unique texts and, for each index, the position of its text among them."""
+    positions = {}
+    inverse = np.array([positions.setdefault(texts[i], len(positions)) for i in indices], dtype=np.intp)
+    return list(positions), inverse
 
-def find_matches(queue_data, exclusion_data):
-    """Find potential matches between queue and exclusion list."""
+def similar_pairs(texts1, present1, texts2, present2, threshold):
+    """Fuzzy-match two lists of normalized texts against each other.
+    Returns a boolean (len(texts1) x len(texts2)) matrix of pairs scoring at or above threshold.
+    Pairs where either value is missing (present1/present2 is False) never match and are not scored."""
+    similar = np.zeros((len(texts1), len(texts2)), dtype=bool)
+    rows = np.flatnonzero(present1)
+    cols = np.flatnonzero(present2)
+    if not rows.size or not cols.size:
+        return similar
+    
+    # Sheets repeat the same names/emails on many rows, so each distinct text is scored once
+    unique1, inverse1 = unique_texts(texts1, rows)
+    unique2, inverse2 = unique_texts(texts2, cols)
+    
+    # Scores are rounded to integers (dtype=np.uint8) the same way fuzzywuzzy's
+    # ratio was, so anything from threshold - 0.5 up counts as a match
+    scores = process.cdist(
+        unique1,
+        unique2,
+        scorer=fuzz.ratio,
+        score_cutoff=threshold - 0.5,
+        dtype=np.uint8,
+        workers=-1
+    )
+    similar[np.ix_(rows, cols)] = (scores >= threshold)[np.ix_(inverse1, inverse2)]
+    return similar
+
+def domain_key(domain):
+    """Return the comparison key for a proprietary domain, or None for empty/common domains."""
+    if not is_proprietary_domain(domain):
+        return None
+    return normalize_text(domain)
+
+def encode_domains(domains, codes):
+    """Map domains to integer codes so they can be compared as arrays.
+    Proprietary domains get a code from (and are added to) `codes`; empty/common domains get 0."""
+    encoded = np.zeros(len(domains), dtype=np.int64)
+    for i, domain in enumerate(domains):
+        key = domain_key(domain)
+        if key is not None:
+            encoded[i] = codes.setdefault(key, len(codes) + 1)
+    return encoded
+
+def same_domain(codes1, codes2):
+    """Return a boolean (len(codes1) x len(codes2)) matrix of pairs sharing a proprietary domain."""
+    codes1 = codes1[:, None]
+    return (codes1 == codes2) & (codes1 != 0)
+
+def find_matches(queue_data, exclusion_data, queue_columns=None, exclusion_columns=None):
+    """Find potential matches between queue and exclusion list.
+    Queue rows are scored against the whole exclusion list in batches of MATCH_BATCH_SIZE;
+    each matching queue row is reported against the first exclusion row it matches.
+    Column indices are looked up from the headers when they aren't passed in."""
     matches = []
     
     # Get column indices
-    queue_headers = queue_data[0]
-    exclusion_headers = exclusion_data[0]
+    if queue_columns is None:
+        queue_columns = get_column_indices(queue_data[0], 'queue')
+    if exclusion_columns is None:
+        exclusion_columns = get_column_indices(exclusion_data[0], 'exclusion')
     
-    queue_name_col, queue_website_col, queue_email_col = get_column_indices(queue_headers, 'queue')
-    excl_name_col, excl_email_col, excl_website_col = get_column_indices(exclusion_headers, 'exclusion')
+    queue_name_col, queue_email_col, queue_website_col = queue_columns
+    excl_name_col, excl_email_col, excl_website_col = exclusion_columns
     
     if None in (queue_name_col, excl_name_col):  # Only require name columns
         return matches
     
-    # Process queue data
+    # Prepare exclusion list data
+    exclusion_rows = []
+    for excl_row in exclusion_data[1:]:
+        if len(excl_row) <= excl_name_col:  # Only check if we have enough columns for name
+            continue
+            
+        excl_name, excl_email, excl_website = get_row_values(excl_row, excl_name_col, excl_email_col, excl_website_col)
+        
+        # Extract domains from exclusion list
+        excl_email_domain = extract_domain_from_email(excl_email)
+        excl_website_domain = extract_domain_from_website(excl_website)
+        
+        exclusion_rows.append((excl_name, excl_email, excl_website, excl_email_domain, excl_website_domain))
+    
+    # Prepare queue data
+    queue_rows = []
     for row_idx, row in enumerate(queue_data[1:], start=2):  # Start from 2 to account for header row
         if len(row) <= queue_name_col:  # Only check if we have enough columns for name
             continue
             
-        queue_name = row[queue_name_col].strip() if queue_name_col < len(row) else ""
-        queue_website = row[queue_website_col].strip() if queue_website_col < len(row) and queue_website_col is not None else ""
-        queue_email = row[queue_email_col].strip() if queue_email_col < len(row) and queue_email_col is not None else ""
+        queue_name, queue_email, queue_website = get_row_values(row, queue_name_col, queue_email_col, queue_website_col)
+        
+        # Skip if no name
+        if not queue_name:
+            continue
         
         # Extract domains
         queue_email_domain = extract_domain_from_email(queue_email)
         queue_website_domain = extract_domain_from_website(queue_website)
         
-        # Skip if no name
-        if not queue_name:
-            continue
+        queue_rows.append((row_idx, queue_name, queue_email, queue_website, queue_email_domain, queue_website_domain))
+    
+    if not queue_rows or not exclusion_rows:
+        return matches
+    
+    # Normalize every value once. Empty values never match and are left out of
+    # the fuzzy scoring (a value that normalizes to "", e.g. "Pty Ltd", still can)
+    excl_names = [normalize_text(r[0]) for r in exclusion_rows]
+    excl_emails = [normalize_text(r[1]) for r in exclusion_rows]
+    excl_websites = [normalize_text(r[2]) for r in exclusion_rows]
+    excl_has_name = np.array([bool(r[0]) for r in exclusion_rows])
+    excl_has_email = np.array([bool(r[1]) for r in exclusion_rows])
+    excl_has_website = np.array([bool(r[2]) for r in exclusion_rows])
+    
+    queue_names = [normalize_text(r[1]) for r in queue_rows]
+    queue_emails = [normalize_text(r[2]) for r in queue_rows]
+    queue_websites = [normalize_text(r[3]) for r in queue_rows]
+    queue_has_name = np.ones(len(queue_rows), dtype=bool)  # Rows without a name were skipped
+    queue_has_email = np.array([bool(r[2]) for r in queue_rows])
+    queue_has_website = np.array([bool(r[3]) for r in queue_rows])
+    
+    # Domain matching - only for proprietary domains (not gmail, yahoo, etc.)
+    domain_codes = {}
+    excl_email_domains = encode_domains([r[3] for r in exclusion_rows], domain_codes)
+    excl_website_domains = encode_domains([r[4] for r in exclusion_rows], domain_codes)
+    queue_email_domains = encode_domains([r[4] for r in queue_rows], domain_codes)
+    queue_website_domains = encode_domains([r[5] for r in queue_rows], domain_codes)
+    
+    for start in range(0, len(queue_rows), MATCH_BATCH_SIZE):
+        batch = slice(start, start + MATCH_BATCH_SIZE)
         
-        # Check against exclusion list
-        for excl_row in exclusion_data[1:]:
-            if len(excl_row) <= excl_name_col:  # Only check if we have enough columns for name
-                continue
-                
-            excl_name = excl_row[excl_name_col].strip() if excl_name_col < len(excl_row) else ""
-            excl_email = excl_row[excl_email_col].strip() if excl_email_col < len(excl_row) and excl_email_col is not None else ""
-            excl_website = excl_row[excl_website_col].strip() if excl_website_col < len(excl_row) and excl_website_col is not None else ""
-            
-            # Extract domains from exclusion list
-            excl_email_domain = extract_domain_from_email(excl_email)
-            excl_website_domain = extract_domain_from_website(excl_website)
-            
-            # Check for matches
-            name_match = is_similar(queue_name, excl_name, NAME_SIMILARITY_THRESHOLD)
-            email_match = queue_email and excl_email and is_similar(queue_email, excl_email, EMAIL_SIMILARITY_THRESHOLD)
-            website_match = queue_website and excl_website and is_similar(queue_website, excl_website, WEBSITE_SIMILARITY_THRESHOLD)
-            
-            # Domain matching - only for proprietary domains (not gmail, yahoo, etc.)
-            email_domain_match = False
-            website_domain_match = False
-            cross_domain_match1 = False
-            cross_domain_match2 = False
-            
-            # Only check domains if they are proprietary
-            if is_proprietary_domain(queue_email_domain) and is_proprietary_domain(excl_email_domain):
-                email_domain_match = (queue_email_domain and excl_email_domain and 
-                                      is_similar(queue_email_domain, excl_email_domain, DOMAIN_SIMILARITY_THRESHOLD))
-            
-            if is_proprietary_domain(queue_website_domain) and is_proprietary_domain(excl_website_domain):
-                website_domain_match = (queue_website_domain and excl_website_domain and 
-                                       is_similar(queue_website_domain, excl_website_domain, DOMAIN_SIMILARITY_THRESHOLD))
-            
-            # Cross-domain matching (email domain vs website domain)
-            if is_proprietary_domain(queue_email_domain) and is_proprietary_domain(excl_website_domain):
-                cross_domain_match1 = (queue_email_domain and excl_website_domain and 
-                                      is_similar(queue_email_domain, excl_website_domain, DOMAIN_SIMILARITY_THRESHOLD))
-            
-            if is_proprietary_domain(queue_website_domain) and is_proprietary_domain(excl_email_domain):
-                cross_domain_match2 = (queue_website_domain and excl_email_domain and 
-                                      is_similar(queue_website_domain, excl_email_domain, DOMAIN_SIMILARITY_THRESHOLD))
-            
-            if (name_match or email_match or website_match or 
-                email_domain_match or website_domain_match or 
-                cross_domain_match1 or cross_domain_match2):
-                matches.append({
-                    'row': row_idx,
-                    'matches': {
-                        'name': name_match,
-                        'email': email_match,
-                        'website': website_match,
-                        'email_domain': email_domain_match,
-                        'website_domain': website_domain_match,
-                        'cross_domain1': cross_domain_match1,
-                        'cross_domain2': cross_domain_match2
-                    },
-                    'queue_data': {
-                        'name': queue_name,
-                        'email': queue_email,
-                        'website': queue_website,
-                        'email_domain': queue_email_domain,
-                        'website_domain': queue_website_domain
-                    },
-                    'exclusion_data': {
-                        'name': excl_name,
-                        'email': excl_email,
-                        'website': excl_website,
-                        'email_domain': excl_email_domain,
-                        'website_domain': excl_website_domain
-                    }
-                })
-                break  # Found a match, no need to check other exclusion list entries
+        # Check for matches
+        name_match = similar_pairs(queue_names[batch], queue_has_name[batch],
+                                   excl_names, excl_has_name, NAME_SIMILARITY_THRESHOLD)
+        email_match = similar_pairs(queue_emails[batch], queue_has_email[batch],
+                                    excl_emails, excl_has_email, EMAIL_SIMILARITY_THRESHOLD)
+        website_match = similar_pairs(queue_websites[batch], queue_has_website[batch],
+                                      excl_websites, excl_has_website, WEBSITE_SIMILARITY_THRESHOLD)
+        email_domain_match = same_domain(queue_email_domains[batch], excl_email_domains)
+        website_domain_match = same_domain(queue_website_domains[batch], excl_website_domains)
+        # Cross-domain matching (email domain vs website domain)
+        cross_domain_match1 = same_domain(queue_email_domains[batch], excl_website_domains)
+        cross_domain_match2 = same_domain(queue_website_domains[batch], excl_email_domains)
+        
+        any_match = (name_match | email_match | website_match |
+                     email_domain_match | website_domain_match |
+                     cross_domain_match1 | cross_domain_match2)
+        
+        for offset in np.flatnonzero(any_match.any(axis=1)):
+            # Only report the first matching exclusion list entry
+            excl_idx = any_match[offset].argmax()
+            row_idx, queue_name, queue_email, queue_website, queue_email_domain, queue_website_domain = queue_rows[start + offset]
+            excl_name, excl_email, excl_website, excl_email_domain, excl_website_domain = exclusion_rows[excl_idx]
+            matches.append({
+                'row': row_idx,
+                'matches': {
+                    'name': bool(name_match[offset, excl_idx]),
+                    'email': bool(email_match[offset, excl_idx]),
+                    'website': bool(website_match[offset, excl_idx]),
+                    'email_domain': bool(email_domain_match[offset, excl_idx]),
+                    'website_domain': bool(website_domain_match[offset, excl_idx]),
+                    'cross_domain1': bool(cross_domain_match1[offset, excl_idx]),
+                    'cross_domain2': bool(cross_domain_match2[offset, excl_idx])
+                },
+                'queue_data': {
+                    'name': queue_name,
+                    'email': queue_email,
+                    'website': queue_website,
+                    'email_domain': queue_email_domain,
+                    'website_domain': queue_website_domain
+                },
+                'exclusion_data': {
+                    'name': excl_name,
+                    'email': excl_email,
+                    'website': excl_website,
+                    'email_domain': excl_email_domain,
+                    'website_domain': excl_website_domain
+                }
+            })
     
     return matches
 
 def get_sheet_id(sheets, spreadsheet_id, sheet_name):
     """Get the numeric sheet ID for a given sheet name."""
-    sheet_metadata = sheets.get(spreadsheetId=spreadsheet_id).execute()
+    sheet_metadata = sheets.get(
+        spreadsheetId=spreadsheet_id,
+        fields='sheets.properties(sheetId,title)'  # Skip the rest of the spreadsheet metadata
+    ).execute()
     sheets_data = sheet_metadata.get('sheets', [])
     
     for sheet in sheets_data:
@@ -333,28 +463,39 @@ def get_sheet_id(sheets, spreadsheet_id, sheet_name):
     
     raise ValueError(f"Sheet '{sheet_name}' not found in spreadsheet")
 
-def highlight_matches(sheets, spreadsheet_id, sheet_name, matches):
-    """Highlight matching rows in the queue sheet."""
+def highlight_matches(sheets, spreadsheet_id, sheet_name, matches, sheet_id=None, num_columns=None):
+    """Highlight matching rows in the queue sheet.
+    The numeric sheet ID is looked up when it isn't passed in. Only the first num_columns
+    columns are highlighted, or the first 100 if it isn't given."""
     if not matches:
         print("No matches found to highlight.")
         return
     
     try:
         # Get the numeric sheet ID
-        sheet_id = get_sheet_id(sheets, spreadsheet_id, sheet_name)
+        if sheet_id is None:
+            sheet_id = get_sheet_id(sheets, spreadsheet_id, sheet_name)
+        
+        # Merge consecutive matching rows into [start, end) runs of 0-based indices
+        row_runs = []
+        for row in sorted({match['row'] for match in matches}):
+            if row_runs and row_runs[-1][1] == row - 1:
+                row_runs[-1][1] = row
+            else:
+                row_runs.append([row - 1, row])  # Convert to 0-based index
         
         # Prepare the batch update request
         requests = []
-        for match in matches:
+        for start_row, end_row in row_runs:
             # Create a red background color format
             requests.append({
                 'repeatCell': {
                     'range': {
                         'sheetId': sheet_id,
-                        'startRowIndex': match['row'] - 1,  # Convert to 0-based index
-                        'endRowIndex': match['row'],
+                        'startRowIndex': start_row,
+                        'endRowIndex': end_row,
                         'startColumnIndex': 0,
-                        'endColumnIndex': 100  # Cover all columns
+                        'endColumnIndex': num_columns or 100  # Cover all used columns
                     },
                     'cell': {
                         'userEnteredFormat': {
@@ -383,8 +524,9 @@ def highlight_matches(sheets, spreadsheet_id, sheet_name, matches):
     except Exception as e:
         print(f"Error highlighting matches: {str(e)}")
 
-def print_queue_data(queue_data):
-    """Print queue data in a readable format."""
+def print_queue_data(queue_data, queue_columns=None):
+    """Print queue data in a readable format.
+    Column indices are looked up from the headers when they aren't passed in."""
     if not queue_data:
         print("No queue data to display.")
         return
@@ -398,7 +540,9 @@ def print_queue_data(queue_data):
     print("\nLooking for columns in queue sheet:")
     print("Headers:", headers)
     
-    name_col, website_col, email_col = get_column_indices(headers, 'queue')
+    if queue_columns is None:
+        queue_columns = get_column_indices(headers, 'queue')
+    name_col, email_col, website_col = queue_columns
     
     if None in (name_col, website_col, email_col):
         print("Could not find required columns in queue data.")
@@ -416,9 +560,7 @@ def print_queue_data(queue_data):
             print(f"Skipping row {row_idx} - not enough columns for name")
             continue
             
-        name = row[name_col].strip() if name_col < len(row) else ""
-        website = row[website_col].strip() if website_col < len(row) and website_col is not None else ""
-        email = row[email_col].strip() if email_col < len(row) and email_col is not None else ""
+        name, email, website = get_row_values(row, name_col, email_col, website_col)
         
         # Extract domains
         email_domain = extract_domain_from_email(email)
@@ -439,27 +581,47 @@ def print_queue_data(queue_data):
 def main():
     """Main function to execute the script."""
     print("Authenticating with Google Sheets API...")
-    sheets = authenticate_google_sheets()
+    creds = load_credentials(SERVICE_ACCOUNT_FILE, SCOPES)
+    sheets = build_sheets_client(creds)
+    
+    # Get data from both sheets, in a single request when they share a spreadsheet,
+    # while the queue sheet ID needed for highlighting is looked up concurrently
+    print("Retrieving queue and exclusion list data...")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        sheet_id_future = executor.submit(
+            call_with_own_client, creds, get_sheet_id, QUEUE_SPREADSHEET_ID, QUEUE_SHEET_NAME)
+        if QUEUE_SPREADSHEET_ID == EXCLUSION_LIST_SPREADSHEET_ID:
+            queue_data, exclusion_data = get_multiple_sheet_data(
+                sheets, QUEUE_SPREADSHEET_ID, [QUEUE_SHEET_NAME, EXCLUSION_LIST_SHEET_NAME])
+        else:
+            exclusion_future = executor.submit(
+                call_with_own_client, creds, fetch_sheet_values, EXCLUSION_LIST_SPREADSHEET_ID, EXCLUSION_LIST_SHEET_NAME)
+            queue_data = get_sheet_data(sheets, QUEUE_SPREADSHEET_ID, QUEUE_SHEET_NAME)
+            print(f"\nFetching data from sheet: {EXCLUSION_LIST_SHEET_NAME}")
+            exclusion_data = exclusion_future.result()
+            print_sheet_summary(exclusion_data)
+    
+    try:
+        queue_sheet_id = sheet_id_future.result()
+    except Exception:
+        queue_sheet_id = None  # highlight_matches retries the lookup and reports the error
     
-    # Get data from both sheets
-    print("Retrieving queue data...")
-    queue_data = get_sheet_data(sheets, QUEUE_SPREADSHEET_ID, QUEUE_SHEET_NAME)
     if not queue_data:
         print(f"No data found in queue sheet '{QUEUE_SHEET_NAME}'.")
         return
     
     # Print queue data for verification
-    print_queue_data(queue_data)
+    queue_columns = get_column_indices(queue_data[0], 'queue')
+    print_queue_data(queue_data, queue_columns)
     
-    print("\nRetrieving exclusion list data...")
-    exclusion_data = get_sheet_data(sheets, EXCLUSION_LIST_SPREADSHEET_ID, EXCLUSION_LIST_SHEET_NAME)
     if not exclusion_data:
         print(f"No data found in exclusion list sheet '{EXCLUSION_LIST_SHEET_NAME}'.")
         return
     
     # Find matches
     print("\nFinding potential matches...")
-    matches = find_matches(queue_data, exclusion_data)
+    exclusion_columns = get_column_indices(exclusion_data[0], 'exclusion')
+    matches = find_matches(queue_data, exclusion_data, queue_columns, exclusion_columns)
     
     if matches:
         print(f"\nFound {len(matches)} potential matches:")
@@ -485,7 +647,8 @@ def main():
         
         # Highlight matches in the queue sheet
         print("\nHighlighting matches in the queue sheet...")
-        highlight_matches(sheets, QUEUE_SPREADSHEET_ID, QUEUE_SHEET_NAME, matches)
+        queue_num_columns = max(len(row) for row in queue_data)
+        highlight_matches(sheets, QUEUE_SPREADSHEET_ID, QUEUE_SHEET_NAME, matches, queue_sheet_id, queue_num_columns)
     else:
         print("No potential matches found.")
 
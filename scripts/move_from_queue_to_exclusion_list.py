@@ -17,8 +17,8 @@ Prerequisites:
 
 import os
 import re
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from concurrent.futures import ThreadPoolExecutor
+from sheets_client import load_credentials, build_sheets_client, call_with_own_client
 
 # Constants
 QUEUE_SPREADSHEET_ID = '1JsrKKr_jZJqLmJEKxpyPygZ4lUu19-GW2dnt7p7g-1k'  # Replace with your queue spreadsheet ID
@@ -28,67 +28,94 @@ EXCLUSION_LIST_SHEET_NAME = '***Exclusion List (GPD + Already Sent)'  # Replace
 SERVICE_ACCOUNT_FILE = 'keys/firm-harbor-456101-q0-5deb4bff67ac.json'
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
-def authenticate_google_sheets():
-    """Authenticate with Google Sheets API using service account."""
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    service = build('sheets', 'v4', credentials=creds)
-    return service.spreadsheets()
+def print_sheet_summary(values):
+    """Print the row count and headers of fetched sheet data."""
+    print(f"Found {len(values)} rows in sheet")
+    if values:
+        # One write for the whole header listing
+        lines = ["First row (headers):"]
+        lines.extend(f"Column {i}: '{header}'" for i, header in enumerate(values[0]))
+        print("\n".join(lines))
 
-def get_sheet_data(sheets, spreadsheet_id, sheet_name):
-    """Retrieve all data from the specified sheet."""
-    print(f"\nFetching data from sheet: {sheet_name}")
+def fetch_sheet_values(sheets, spreadsheet_id, sheet_name):
+    """Retrieve all data from the specified sheet without printing anything."""
     result = sheets.values().get(
         spreadsheetId=spreadsheet_id,
         range=f"{sheet_name}!A:Z"  # Get all columns
     ).execute()
-    values = result.get('values', [])
-    print(f"Found {len(values)} rows in sheet")
-    if values:
-        print("First row (headers):")
-        for i, header in enumerate(values[0]):
-            print(f"Column {i}: '{header}'")
+    return result.get('values', [])
+
+def get_sheet_data(sheets, spreadsheet_id, sheet_name):
+    """Retrieve all data from the specified sheet."""
+    print(f"\nFetching data from sheet: {sheet_name}")
+    values = fetch_sheet_values(sheets, spreadsheet_id, sheet_name)
+    print_sheet_summary(values)
     return values
 
+def get_multiple_sheet_data(sheets, spreadsheet_id, sheet_names):
+    """Retrieve all data from several sheets of the same spreadsheet in a single request."""
+    result = sheets.values().batchGet(
+        spreadsheetId=spreadsheet_id,
+        ranges=[f"{sheet_name}!A:Z" for sheet_name in sheet_names]  # Get all columns
+    ).execute()
+    value_ranges = result.get('valueRanges', [])
+    
+    all_values = []
+    for sheet_name, value_range in zip(sheet_names, value_ranges):
+        values = value_range.get('values', [])
+        print(f"\nFetched data from sheet: {sheet_name}")
+        print_sheet_summary(values)
+        all_values.append(values)
+    return all_values
+
+def get_queue_and_exclusion_data(sheets, creds, queue_spreadsheet_id, queue_sheet_name, exclusion_spreadsheet_id, exclusion_sheet_name):
+    """Retrieve the queue and exclusion list data, in a single request when they share a spreadsheet.
+    creds are used to build a separate client for the concurrent download otherwise."""
+    if queue_spreadsheet_id == exclusion_spreadsheet_id:
+        queue_data, exclusion_data = get_multiple_sheet_data(
+            sheets, queue_spreadsheet_id, [queue_sheet_name, exclusion_sheet_name])
+        return queue_data, exclusion_data
+    
+    # Different spreadsheets: download the exclusion list concurrently
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        exclusion_future = executor.submit(
+            call_with_own_client, creds, fetch_sheet_values, exclusion_spreadsheet_id, exclusion_sheet_name)
+        queue_data = get_sheet_data(sheets, queue_spreadsheet_id, queue_sheet_name)
+        print(f"\nFetching data from sheet: {exclusion_sheet_name}")
+        exclusion_data = exclusion_future.result()
+        print_sheet_summary(exclusion_data)
+    return queue_data, exclusion_data
+
 def get_column_indices(headers, sheet_type):
-    """Get the indices of required columns based on sheet type."""
-    if sheet_type == 'queue':
-        try:
-            # Updated column names to match new queue sheet format
-            name_col = headers.index("Winery or Supplier Name")
-            email_col = headers.index("Email")
-            website_col = headers.index("Website")
-            return name_col, email_col, website_col
-        except ValueError as e:
-            print(f"Error: Required column not found in queue sheet - {str(e)}")
-            print("Available columns in queue sheet:")
-            for i, header in enumerate(headers):
-                print(f"{i}: '{header}'")
-            return None, None, None
-    else:  # exclusion list
-        try:
-            name_col = headers.index("Winery or Supplier Name")
-            email_col = headers.index("Email")
-            website_col = headers.index("Website")
-            return name_col, email_col, website_col
-        except ValueError as e:
-            print(f"Error: Required column not found in exclusion list - {str(e)}")
-            print("Available columns in exclusion list:")
-            for i, header in enumerate(headers):
-                print(f"{i}: '{header}'")
-            return None, None, None
-
-def get_existing_entries(sheets, spreadsheet_id, sheet_name):
-    """Get existing entries from the exclusion list to avoid duplicates."""
-    data = get_sheet_data(sheets, spreadsheet_id, sheet_name)
+    """Get the (name, email, website) column indices; both sheet types use the same headers."""
+    sheet_label = 'queue sheet' if sheet_type == 'queue' else 'exclusion list'
+    try:
+        name_col = headers.index("Winery or Supplier Name")
+        email_col = headers.index("Email")
+        website_col = headers.index("Website")
+        return name_col, email_col, website_col
+    except ValueError as e:
+        print(f"Error: Required column not found in {sheet_label} - {str(e)}")
+        print(f"Available columns in {sheet_label}:")
+        for i, header in enumerate(headers):
+            print(f"{i}: '{header}'")
+        return None, None, None
+
+def entry_key(name, email, website):
+    """Return the key used to detect duplicate entries, ignoring case."""
+    return (name.lower(), email.lower(), website.lower())
+
+def get_existing_entries(data):
+    """Get existing entries from the exclusion list data to avoid duplicates.
+    Returns the set of entry keys and the number of rows in the sheet (including the header)."""
     if not data:
-        return set()
+        return set(), 0
     
     # Get column indices
     headers = data[0]
     name_col, email_col, website_col = get_column_indices(headers, 'exclusion')
     if None in (name_col, email_col, website_col):
-        return set()
+        return set(), len(data)
     
     # Skip header row
     existing_entries = set()
@@ -99,10 +126,9 @@ def get_existing_entries(sheets, spreadsheet_id, sheet_name):
             website = row[website_col].strip() if website_col < len(row) else ""
             
             if name or email or website:  # Only add non-empty entries
-                entry = (name, email, website)
-                existing_entries.add(entry)
+                existing_entries.add(entry_key(name, email, website))
     
-    return existing_entries
+    return existing_entries, len(data)
 
 def clear_queue_rows(sheets, spreadsheet_id, sheet_name, rows_to_clear):
     """Clear the specified rows from the queue sheet."""
@@ -113,27 +139,38 @@ def clear_queue_rows(sheets, spreadsheet_id, sheet_name, rows_to_clear):
     rows_to_clear.sort(reverse=True)
     
     # Get the sheet ID
-    sheet_metadata = sheets.get(spreadsheetId=spreadsheet_id).execute()
+    sheet_metadata = sheets.get(
+        spreadsheetId=spreadsheet_id,
+        fields='sheets.properties(sheetId,title)'  # Skip the rest of the spreadsheet metadata
+    ).execute()
     sheet_id = None
     for sheet in sheet_metadata.get('sheets', []):
         if sheet['properties']['title'] == sheet_name:
             sheet_id = sheet['properties']['sheetId']
             break
     
-    if not sheet_id:
+    if sheet_id is None:  # The first sheet of a spreadsheet usually has ID 0
         print(f"Error: Could not find sheet ID for '{sheet_name}'")
         return
     
+    # Merge consecutive rows into [start, end) runs of 0-based indices, still in descending order
+    row_runs = []
+    for row in rows_to_clear:
+        if row_runs and row_runs[-1][0] == row:
+            row_runs[-1][0] = row - 1
+        else:
+            row_runs.append([row - 1, row])  # Convert to 0-based index
+    
     # Prepare the batch update request
     requests = []
-    for row in rows_to_clear:
+    for start_row, end_row in row_runs:
         requests.append({
             'deleteDimension': {
                 'range': {
                     'sheetId': sheet_id,
                     'dimension': 'ROWS',
-                    'startIndex': row - 1,  # Convert to 0-based index
-                    'endIndex': row
+                    'startIndex': start_row,
+                    'endIndex': end_row
                 }
             }
         })
@@ -152,10 +189,11 @@ def clear_queue_rows(sheets, spreadsheet_id, sheet_name, rows_to_clear):
     except Exception as e:
         print(f"Error removing rows from queue sheet: {str(e)}")
 
-def process_queue_data(sheets, queue_spreadsheet_id, queue_sheet_name, exclusion_spreadsheet_id, exclusion_sheet_name):
+def process_queue_data(sheets, creds, queue_spreadsheet_id, queue_sheet_name, exclusion_spreadsheet_id, exclusion_sheet_name):
     """Process the queue data and move unique entries to the exclusion list."""
-    # Get queue data
-    queue_data = get_sheet_data(sheets, queue_spreadsheet_id, queue_sheet_name)
+    # Get queue and exclusion list data
+    queue_data, exclusion_data = get_queue_and_exclusion_data(
+        sheets, creds, queue_spreadsheet_id, queue_sheet_name, exclusion_spreadsheet_id, exclusion_sheet_name)
     if not queue_data:
         print(f"No data found in queue sheet '{queue_sheet_name}'.")
         return 0
@@ -167,10 +205,10 @@ def process_queue_data(sheets, queue_spreadsheet_id, queue_sheet_name, exclusion
         return 0
     
     # Get existing entries from exclusion list
-    existing_entries = get_existing_entries(sheets, exclusion_spreadsheet_id, exclusion_sheet_name)
+    existing_entries, exclusion_num_rows = get_existing_entries(exclusion_data)
     
-    # First, collect unique entries from the queue
-    unique_queue_entries = set()
+    # First, collect unique entries from the queue, keeping the first spelling of each
+    unique_queue_entries = {}
     rows_to_remove = []  # Track which rows to remove
     for row_idx, row in enumerate(queue_data[1:], start=2):  # Start from 2 to account for header row
         if len(row) > max(name_col, email_col, website_col):
@@ -182,9 +220,9 @@ def process_queue_data(sheets, queue_spreadsheet_id, queue_sheet_name, exclusion
             if not name and not email and not website:
                 continue
                 
-            entry = (name, email, website)
-            if entry not in existing_entries:
-                unique_queue_entries.add(entry)
+            key = entry_key(name, email, website)
+            if key not in existing_entries:
+                unique_queue_entries.setdefault(key, (name, email, website))
                 rows_to_remove.append(row_idx)
     
     if not unique_queue_entries:
@@ -192,11 +230,10 @@ def process_queue_data(sheets, queue_spreadsheet_id, queue_sheet_name, exclusion
         return 0
     
     # Prepare the data for batch update
-    values = [[entry[0], entry[1], entry[2]] for entry in unique_queue_entries]
+    values = [[entry[0], entry[1], entry[2]] for entry in unique_queue_entries.values()]
     
     # Get the next empty row in the exclusion list
-    exclusion_data = get_sheet_data(sheets, exclusion_spreadsheet_id, exclusion_sheet_name)
-    next_row = len(exclusion_data) + 1 if exclusion_data else 2  # Start after header row
+    next_row = exclusion_num_rows + 1 if exclusion_num_rows else 2  # Start after header row
     
     # Update the exclusion list
     body = {
@@ -220,12 +257,14 @@ def process_queue_data(sheets, queue_spreadsheet_id, queue_sheet_name, exclusion
 def main():
     """Main function to execute the script."""
     print("Authenticating with Google Sheets API...")
-    sheets = authenticate_google_sheets()
+    creds = load_credentials(SERVICE_ACCOUNT_FILE, SCOPES)
+    sheets = build_sheets_client(creds)
     
     # Process the queue and update the exclusion list
     try:
         entries_added = process_queue_data(
             sheets,
+            creds,
             QUEUE_SPREADSHEET_ID,
             QUEUE_SHEET_NAME,
             EXCLUSION_LIST_SPREADSHEET_ID,
@@ -26,9 +26,13 @@ Prerequisites:
 
 import os
 import re
+import time
+import random
 import argparse
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from googleapiclient.errors import HttpError
+from sheets_client import load_credentials, build_sheets_client, call_with_own_client
 
 # Constants
 QUEUE_SPREADSHEET_ID = '1JsrKKr_jZJqLmJEKxpyPygZ4lUu19-GW2dnt7p7g-1k'  # Replace with your queue spreadsheet ID
@@ -36,167 +40,277 @@ QUEUE_SHEET_NAME = '** Queue to Send Out Emails'  # Replace with your queue shee
 SERVICE_ACCOUNT_FILE = 'keys/firm-harbor-456101-q0-5deb4bff67ac.json'
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
+# Times a request is retried, with exponential backoff, after a rate limit (429) or server
+# error. Requests that write rows are only retried after a rate limit, see execute_write.
+API_NUM_RETRIES = 5
+# HTTP status of a request rejected by the API's rate limit; nothing was written
+HTTP_TOO_MANY_REQUESTS = 429
+
 # Fixed column indices from the source sheet format
 WINERY_COL = 7
 WEBSITE_COL = 8
 EMAIL_COL = 11
 
+# Only the source columns from the first to the last of the above are downloaded
+SOURCE_FIRST_COL = min(WINERY_COL, WEBSITE_COL, EMAIL_COL)
+SOURCE_LAST_COL = max(WINERY_COL, WEBSITE_COL, EMAIL_COL)
+SOURCE_COLUMNS = f"{chr(65 + SOURCE_FIRST_COL)}:{chr(65 + SOURCE_LAST_COL)}"
+
+# Precompiled patterns used by extract_spreadsheet_info
+_SPREADSHEET_ID_RE = re.compile(r'/spreadsheets/d/([a-zA-Z0-9-_]+)')
+_GID_RE = re.compile(r'[?&#]gid=(\d+)')
+
 def extract_spreadsheet_info(url):
     """Extract spreadsheet ID and sheet GID from a Google Sheets URL."""
     if not url:
         return None, None
     
     # Extract spreadsheet ID
-    spreadsheet_id_match = re.search(r'/spreadsheets/d/([a-zA-Z0-9-_]+)', url)
+    spreadsheet_id_match = _SPREADSHEET_ID_RE.search(url)
     if not spreadsheet_id_match:
         return None, None
     
     spreadsheet_id = spreadsheet_id_match.group(1)
     
     # Extract sheet GID
-    gid_match = re.search(r'[?&#]gid=(\d+)', url)
+    gid_match = _GID_RE.search(url)
     sheet_gid = gid_match.group(1) if gid_match else None
     
     return spreadsheet_id, sheet_gid
 
-def authenticate_google_sheets():
-    """Authenticate with Google Sheets API using service account."""
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    service = build('sheets', 'v4', credentials=creds)
-    return service.spreadsheets()
+def execute_write(request):
+    """Execute a request that is not safe to repeat, such as values.append.
+    Unlike execute(num_retries=...), which also retries server errors and timeouts after which
+    the rows may already have been written, it only retries requests rejected with HTTP 429."""
+    for attempt in range(API_NUM_RETRIES + 1):
+        try:
+            return request.execute()
+        except HttpError as e:
+            if e.resp.status != HTTP_TOO_MANY_REQUESTS or attempt == API_NUM_RETRIES:
+                raise
+            time.sleep(2 ** attempt + random.random())  # Exponential backoff with jitter
+
+def column_index(column_letters):
+    """Convert spreadsheet column letters (e.g. "H", or a cell like "H1") to a 0-based column index."""
+    index = 0
+    for letter in column_letters.rstrip('0123456789'):
+        index = index * 26 + ord(letter) - 64
+    return index - 1
 
-def get_sheet_data(sheets, spreadsheet_id, sheet_name):
-    """Retrieve all data from the specified sheet."""
+def print_sheet_summary(values, columns="A:Z", header_only=False):
+    """Print the row count and headers of fetched sheet data; there is no row count when
+    only the header row was fetched. Headers are numbered by their position in the sheet,
+    not in the fetched columns."""
+    if not header_only:
+        print(f"Found {len(values)} rows in sheet")
+    if values:
+        # One write for the whole header listing
+        lines = ["First row (headers):"]
+        first_col = column_index(columns.split(':')[0])
+        lines.extend(f"Column {i}: '{cell}'" for i, cell in enumerate(values[0], start=first_col))
+        print("\n".join(lines))
+
+def fetch_sheet_values(sheets, spreadsheet_id, sheet_name, columns="A:Z"):
+    """Retrieve the given columns (all columns by default) from the specified sheet without
+    printing anything. Rows start at the first of the requested columns."""
+    result = sheets.values().get(
+        spreadsheetId=spreadsheet_id,
+        range=f"{sheet_name}!{columns}"
+    ).execute(num_retries=API_NUM_RETRIES)
+    return result.get('values', [])
+
+def get_sheet_data(sheets, spreadsheet_id, sheet_name, columns="A:Z"):
+    """Retrieve the given columns (all columns by default) from the specified sheet."""
     print(f"\nFetching data from sheet: {sheet_name}")
+    values = fetch_sheet_values(sheets, spreadsheet_id, sheet_name, columns)
+    print_sheet_summary(values, columns)
+    return values
+
+def get_multiple_sheet_data(sheets, spreadsheet_id, sheet_names, sheet_columns, sheet_header_only=None):
+    """Retrieve data from several sheets of the same spreadsheet in a single request.
+    sheet_columns gives the columns to fetch from each sheet, e.g. "A:Z", and sheet_header_only
+    whether each of them is just the header row, e.g. "A1:Z1" (none are by default)."""
+    if sheet_header_only is None:
+        sheet_header_only = [False] * len(sheet_names)
+    result = sheets.values().batchGet(
+        spreadsheetId=spreadsheet_id,
+        ranges=[f"{sheet_name}!{columns}" for sheet_name, columns in zip(sheet_names, sheet_columns)]
+    ).execute(num_retries=API_NUM_RETRIES)
+    value_ranges = result.get('valueRanges', [])
+    
+    all_values = []
+    for sheet_name, columns, header_only, value_range in zip(sheet_names, sheet_columns, sheet_header_only, value_ranges):
+        values = value_range.get('values', [])
+        print(f"\nFetched data from sheet: {sheet_name}")
+        print_sheet_summary(values, columns, header_only)
+        all_values.append(values)
+    return all_values
+
+def get_source_data_and_queue_headers(sheets, creds, source_spreadsheet_id, source_sheet_name, queue_spreadsheet_id, queue_sheet_name):
+    """Retrieve the source sheet data and the queue sheet's header row, in a single request when
+    they share a spreadsheet. Only the SOURCE_COLUMNS of the source sheet are downloaded."""
+    if source_spreadsheet_id == queue_spreadsheet_id:
+        source_data, queue_data = get_multiple_sheet_data(
+            sheets, source_spreadsheet_id, [source_sheet_name, queue_sheet_name], [SOURCE_COLUMNS, "A1:Z1"],
+            [False, True])
+        return source_data, queue_data
+    
+    # Different spreadsheets: download the queue headers concurrently
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        queue_future = executor.submit(
+            call_with_own_client, creds, fetch_sheet_values, queue_spreadsheet_id, queue_sheet_name, "A1:Z1")
+        source_data = get_sheet_data(sheets, source_spreadsheet_id, source_sheet_name, SOURCE_COLUMNS)
+        print(f"\nFetching data from sheet: {queue_sheet_name}")
+        queue_data = queue_future.result()
+        print_sheet_summary(queue_data, "A1:Z1", header_only=True)
+    return source_data, queue_data
+
+def get_queue_names(sheets, spreadsheet_id, sheet_name, name_col):
+    """Retrieve the winery names below the header row of the queue sheet."""
+    name_column = chr(65 + name_col)  # Headers are read from A1:Z1
     result = sheets.values().get(
         spreadsheetId=spreadsheet_id,
-        range=f"{sheet_name}!A:Z"  # Get all columns
-    ).execute()
+        range=f"{sheet_name}!{name_column}2:{name_column}",
+        majorDimension='COLUMNS'
+    ).execute(num_retries=API_NUM_RETRIES)
     values = result.get('values', [])
-    print(f"Found {len(values)} rows in sheet")
-    if values and len(values) > 0:
-        print("First row (headers):")
-        first_row = values[0] if values else []
-        for i, cell in enumerate(first_row):
-            print(f"Column {i}: '{cell}'")
-    return values
+    return values[0] if values else []
 
 def get_queue_column_indices(headers):
     """Get the indices of required columns in the queue sheet."""
+    # Map each header to its first position, as list.index would
+    header_indices = {}
+    for i, header in enumerate(headers):
+        header_indices.setdefault(header, i)
     try:
-        country_col = headers.index("Country")
-        name_col = headers.index("Winery or Supplier Name")
-        email_col = headers.index("Email")
-        website_col = headers.index("Website")
+        country_col = header_indices["Country"]
+        name_col = header_indices["Winery or Supplier Name"]
+        email_col = header_indices["Email"]
+        website_col = header_indices["Website"]
         return country_col, name_col, email_col, website_col
-    except ValueError as e:
-        print(f"Error: Required column not found in queue sheet - {str(e)}")
+    except KeyError as e:
+        print(f"Error: Required column not found in queue sheet - '{e.args[0]}' is not in list")
         print("Available columns in queue sheet:")
         for i, header in enumerate(headers):
             print(f"{i}: '{header}'")
         return None, None, None, None
 
-def get_existing_entries(sheets, spreadsheet_id, sheet_name):
-    """Get existing entries from the queue sheet to avoid duplicates."""
-    data = get_sheet_data(sheets, spreadsheet_id, sheet_name)
-    if not data:
-        return set()
-    
-    # Get column indices
-    headers = data[0]
-    country_col, name_col, email_col, website_col = get_queue_column_indices(headers)
-    if None in (country_col, name_col, email_col, website_col):
-        return set()
-    
-    # Skip header row
-    existing_entries = set()
-    for row in data[1:]:
-        if len(row) > name_col:  # We only need the winery name for comparison
-            name = row[name_col].strip() if name_col < len(row) else ""
-            
-            if name:  # Only add non-empty entries
-                existing_entries.add(name.lower())  # Case-insensitive comparison
-    
-    return existing_entries
-
-def process_source_data(sheets, source_spreadsheet_id, source_sheet_name, queue_spreadsheet_id, queue_sheet_name, country):
+def get_existing_entries(names):
+    """Get existing entries from the queue sheet's winery names to avoid duplicates.
+    The names are returned stripped and casefolded, so callers compare against them with
+    winery.casefold() and must not normalize them again."""
+    existing_keys_casefolded = set()
+    for name in names:
+        name = name.strip()
+        if name:  # Only add non-empty entries
+            existing_keys_casefolded.add(name.casefold())  # Case-insensitive comparison
+    
+    return existing_keys_casefolded
+
+def build_queue_row(row_template, queue_columns, country, winery, email, website):
+    """Create a queue sheet row from a copy of row_template, placing the values at the
+    (country, name, email, website) column indices given by queue_columns."""
+    country_col, name_col, email_col, website_col = queue_columns
+    new_row = row_template.copy()
+    new_row[country_col] = country
+    new_row[name_col] = winery
+    new_row[email_col] = email
+    new_row[website_col] = website
+    return new_row
+
+def process_source_data(sheets, creds, source_spreadsheet_id, source_sheet_name, queue_spreadsheet_id, queue_sheet_name, country):
     """Process the source data and copy unique entries to the queue sheet."""
-    # Get source data
-    source_data = get_sheet_data(sheets, source_spreadsheet_id, source_sheet_name)
+    # Get source data and queue headers
+    source_data, queue_data = get_source_data_and_queue_headers(
+        sheets, creds, source_spreadsheet_id, source_sheet_name, queue_spreadsheet_id, queue_sheet_name)
     if not source_data:
         print(f"No data found in source sheet '{source_sheet_name}'.")
         return 0
     
     # Verify that the source data contains the expected columns
-    if len(source_data[0]) <= max(WINERY_COL, WEBSITE_COL, EMAIL_COL):
-        print(f"Error: Source sheet does not have the expected columns. It has {len(source_data[0])} columns, but we need at least {max(WINERY_COL, WEBSITE_COL, EMAIL_COL) + 1} columns.")
+    source_num_columns = SOURCE_FIRST_COL + len(source_data[0])
+    if source_num_columns <= SOURCE_LAST_COL:
+        print(f"Error: Source sheet does not have the expected columns. It has {source_num_columns} columns, but we need at least {SOURCE_LAST_COL + 1} columns.")
         return 0
     
-    # Get existing entries from queue sheet
-    existing_entries = get_existing_entries(sheets, queue_spreadsheet_id, queue_sheet_name)
+    # Positions of the source fields within the downloaded columns
+    winery_idx = WINERY_COL - SOURCE_FIRST_COL
+    website_idx = WEBSITE_COL - SOURCE_FIRST_COL
+    email_idx = EMAIL_COL - SOURCE_FIRST_COL
     
     # Get queue sheet headers and column indices
-    queue_data = get_sheet_data(sheets, queue_spreadsheet_id, queue_sheet_name)
     if not queue_data:
         print(f"No data found in queue sheet '{queue_sheet_name}'.")
         return 0
     
     queue_headers = queue_data[0]
-    country_col, name_col, email_col, website_col = get_queue_column_indices(queue_headers)
-    if None in (country_col, name_col, email_col, website_col):
+    queue_columns = get_queue_column_indices(queue_headers)
+    if None in queue_columns:
         return 0
+    country_col, name_col, email_col, website_col = queue_columns
     
-    # Collect unique entries from source
-    unique_entries = []
-    seen_wineries = set()  # To track wineries we've already seen in this processing batch
+    # Wineries already in the queue, plus those seen so far in this processing batch
+    seen_wineries = get_existing_entries(get_queue_names(sheets, queue_spreadsheet_id, queue_sheet_name, name_col))
+    print(f"Found {len(seen_wineries)} existing entries in queue sheet")
     
-    for row_idx, row in enumerate(source_data[1:], start=2):  # Skip header row, 1-indexed
-        if len(row) <= WINERY_COL:  # Skip rows that don't have the winery field
+    # Collect the (winery, email, website) of unique entries from source
+    accepted = []
+    
+    # Skip header row without copying the rest of the sheet
+    for row_idx, row in enumerate(itertools.islice(source_data, 1, None), start=2):  # 1-indexed
+        row_len = len(row)
+        if row_len <= winery_idx:  # Skip rows that don't have the winery field
             continue
         
-        # Extract the data from the fixed column positions
-        winery = row[WINERY_COL].strip() if WINERY_COL < len(row) else ""
-        website = row[WEBSITE_COL].strip() if WEBSITE_COL < len(row) and len(row) > WEBSITE_COL else ""
-        email = row[EMAIL_COL].strip() if EMAIL_COL < len(row) and len(row) > EMAIL_COL else ""
+        # Extract the winery from its fixed column position
+        winery = row[winery_idx].strip()
         
         # Skip empty entries
         if not winery:
             continue
         
         # Skip if already in the queue or if we've already seen it in this batch
-        if winery.lower() in existing_entries or winery.lower() in seen_wineries:
+        key = winery.casefold()  # Case-insensitive comparison, e.g. "Straße" and "STRASSE"
+        if key in seen_wineries:
             continue
         
-        # Create a new row with the correct column order
-        new_row = [""] * (max(country_col, name_col, email_col, website_col) + 1)
-        new_row[country_col] = country
-        new_row[name_col] = winery
-        new_row[email_col] = email
-        new_row[website_col] = website
-        unique_entries.append(new_row)
+        # Only rows that will be added need their website and email
+        website = row[website_idx].strip() if row_len > website_idx else ""
+        email = row[email_idx].strip() if row_len > email_idx else ""
+        
+        accepted.append((winery, email, website))
         
         # Remember we've seen this winery
-        seen_wineries.add(winery.lower())
+        seen_wineries.add(key)
     
-    if not unique_entries:
+    if not accepted:
         print("No new entries to add to the queue sheet.")
         return 0
     
-    # Get the next empty row in the queue sheet
-    next_row = len(queue_data) + 1
+    # Only the new entries are needed from here on; let the source sheet be freed before
+    # the queue rows are built and the append request body is serialized
+    del source_data
+    
+    # Create the new rows with the correct column order
+    row_template = [""] * (max(queue_columns) + 1)
+    unique_entries = [
+        build_queue_row(row_template, queue_columns, country, winery, email, website)
+        for winery, email, website in accepted
+    ]
     
-    # Update the queue sheet
+    # Append to the queue sheet; the API inserts the rows after the last row of the queue
     body = {
         'values': unique_entries
     }
     
-    result = sheets.values().update(
+    # Appending again would duplicate the rows, so only rate-limited attempts are retried
+    result = execute_write(sheets.values().append(
         spreadsheetId=queue_spreadsheet_id,
-        range=f"{queue_sheet_name}!A{next_row}",
+        range=f"{queue_sheet_name}!A:Z",
         valueInputOption='USER_ENTERED',
+        insertDataOption='INSERT_ROWS',
         body=body
-    ).execute()
+    ))
     
     print(f"Added {len(unique_entries)} new entries to the queue sheet:")
     for entry in unique_entries[:5]:  # Print first 5 entries
@@ -222,16 +336,20 @@ def main():
         return
     
     print("Authenticating with Google Sheets API...")
-    sheets = authenticate_google_sheets()
+    creds = load_credentials(SERVICE_ACCOUNT_FILE, SCOPES)
+    sheets = build_sheets_client(creds)
     
     # Get sheet name from GID
-    source_sheet_metadata = sheets.get(spreadsheetId=source_spreadsheet_id).execute()
-    source_sheet_name = None
-    for sheet in source_sheet_metadata.get('sheets', []):
-        if str(sheet['properties']['sheetId']) == source_sheet_gid:
-            source_sheet_name = sheet['properties']['title']
-            break
-    
+    source_sheet_metadata = sheets.get(
+        spreadsheetId=source_spreadsheet_id,
+        fields='sheets.properties(sheetId,title)'  # Skip the rest of the spreadsheet metadata
+    ).execute(num_retries=API_NUM_RETRIES)
+    gid_to_title = {
+        str(sheet['properties']['sheetId']): sheet['properties']['title']
+        for sheet in source_sheet_metadata.get('sheets', [])
+    }
+    source_sheet_name = gid_to_title.get(source_sheet_gid)
+
     if not source_sheet_name:
         print(f"Error: Could not find sheet with GID {source_sheet_gid}.")
         return
@@ -240,6 +358,7 @@ def main():
     try:
         entries_added = process_source_data(
             sheets,
+            creds,
             source_spreadsheet_id,
             source_sheet_name,
             QUEUE_SPREADSHEET_ID,
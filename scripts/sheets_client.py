@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Sheets Client
+
+Google Sheets API helpers shared by the queue and exclusion list scripts.
+
+The service account credentials are loaded once per run and shared; only the Sheets
+client is built per thread, because googleapiclient clients are not thread-safe.
+"""
+
+import httplib2
+import google_auth_httplib2
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+
+def load_credentials(service_account_file, scopes):
+    """Load the service account credentials and fetch their access token.
+    The token is fetched here, before any threads start, so that every client built from
+    the credentials reuses it instead of fetching its own."""
+    creds = service_account.Credentials.from_service_account_file(
+        service_account_file, scopes=scopes)
+    creds.refresh(google_auth_httplib2.Request(httplib2.Http()))
+    return creds
+
+def build_sheets_client(creds):
+    """Build a Sheets client (the spreadsheets resource) authorized with creds."""
+    # Use the discovery document bundled with the client library; there is no
+    # discovery cache to look up (or warn about) when it isn't fetched over HTTP
+    service = build('sheets', 'v4', credentials=creds, static_discovery=True, cache_discovery=False)
+    return service.spreadsheets()
+
+def call_with_own_client(creds, func, *args):
+    """Call func(sheets, *args) with a new Sheets client built from creds.
+    googleapiclient clients are not thread-safe, so each worker thread needs its own."""
+    return func(build_sheets_client(creds), *args)
@@ -0,0 +1,93 @@
+import io
+import os
+import sys
+import unittest
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import convert_to_aud_and_per_bottle as price_updater
+
+
+class FakeRequest:
+    def __init__(self, response):
+        self.response = response
+
+    def execute(self):
+        return self.response
+
+
+class FakeValues:
+    def __init__(self, sheet):
+        self.sheet = sheet
+
+    def get(self, spreadsheetId, range):
+        self.sheet.ranges.append(range)
+        return FakeRequest({'values': self.sheet.rows})
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.sheet.written.extend(body['data'])
+        return FakeRequest({})
+
+
+class FakeSheets:
+    """Stands in for the Sheets client; values.get returns all rows of a single sheet."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.ranges = []
+        self.written = []
+
+    def values(self):
+        return FakeValues(self)
+
+
+def process(rows):
+    """Run process_sheet on rows, returning the fake client and the printed output."""
+    sheets = FakeSheets(rows)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        price_updater.process_sheet(sheets, 'spreadsheet', 'Sheet')
+    return sheets, output.getvalue()
+
+
+class ProcessSheetTest(unittest.TestCase):
+    def test_reads_sheet_in_one_request(self):
+        sheets, _ = process([['Wine Name', 'RRP', 'Discount RRP'], ['Red', 'R100', 'R90']])
+        self.assertEqual(sheets.ranges, ['Sheet!A:P'])
+
+    def test_product_name_falls_back_to_column_d(self):
+        # Wine Name is right of the price columns and missing from the row, so the product
+        # name (and promo detection) comes from column D
+        rows = [['A', 'B', 'C', 'D', 'Discount RRP', 'RRP', 'G', 'Wine Name'],
+                ['', '', 'x', 'Promo y', 'R100', 'R100']]
+        sheets, output = process(rows)
+        self.assertEqual(sheets.written, [
+            {'range': 'Sheet!E2:E2', 'values': [['$0.72']]},
+            {'range': 'Sheet!F2:F2', 'values': [['$0.72']]},
+        ])
+        self.assertIn('Row 2 - Promo y', output)
+
+
+class ConvertCurrencyTest(unittest.TestCase):
+    def test_case_prices_with_extra_spaces(self):
+        # Runs of spaces are collapsed before either parsing path sees the price
+        for price in ('R1050,00 / Case', 'R 1050,00 / Case', 'R 1050,00  / Case', 'R1050,00  / Case'):
+            with self.subTest(price=price):
+                self.assertEqual(price_updater.convert_currency_to_aud(price), '$7.52')
+
+    def test_bottle_count_with_extra_spaces(self):
+        # The last one only matches the step-by-step parser
+        for price in ('R1050,00 for 6x 750ml', 'R1050,00  for 6x 750ml', 'for 6x 750ml R1050,00'):
+            with self.subTest(price=price):
+                self.assertEqual(price_updater.convert_currency_to_aud(price), '$15.05')
+
+    def test_converted_prices_with_surrounding_spaces_are_left_alone(self):
+        for price in ('$12.34', ' $12.34', '$12.34 ', '\t$9.99\n'):
+            with self.subTest(price=price):
+                self.assertEqual(price_updater.convert_currency_to_aud(price), price)
+        self.assertEqual(price_updater.convert_currency_to_aud(' R100 '), '$8.60')
+
+
+if __name__ == '__main__':
+    unittest.main()